@@ -51,11 +51,13 @@ python calendar_tool.py --load calendar.xlsx --add-event 2025-07-01 "Project Kic
 
 
 import argparse
+import bisect
 import csv
 import logging
 import os
 import sys
 from datetime import datetime, date
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple, Any, Union
 import re
@@ -80,6 +82,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Date formats recognised in calendar cells, in order of preference
+_DATE_FORMATS = (
+    "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y",
+    "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M:%S"
+)
+# Month-first slash dates can match the same strings as day-first ones, which must win
+_DAY_FIRST_IDX = _DATE_FORMATS.index("%d/%m/%Y")
+_MONTH_FIRST_IDX = _DATE_FORMATS.index("%m/%d/%Y")
+# Cheap shape check that every format above satisfies, used to skip strptime on plain text
+_DATE_HINT = re.compile(r'^\s*\d{1,4}[-/]\d{1,4}[-/]\d{1,4}')
+# Number of parsed strings between re-orderings of the format list by hit count
+_FORMAT_REORDER_INTERVAL = 1000
+
 
 class CalendarException(Exception):
     """Custom exception for calendar operations"""
@@ -98,9 +113,9 @@ class ExcelCalendarManager:
                     date_obj = self._parse_date(lines[0])
                     if date_obj:
                         date_key = date_obj.strftime("%Y-%m-%d")
+                        cell_addr = cell.coordinate
                         for event_title in lines[1:]:
                             if event_title.strip():
-                                cell_addr = f"{get_column_letter(cell.column)}{cell.row}"
                                 if date_key not in self.events:
                                     self.events[date_key] = {}
                                 self.events[date_key][cell_addr] = {
@@ -115,6 +130,15 @@ class ExcelCalendarManager:
         self.workbook = None
         self.calendar_sheet = None
         self.events = {}  # Dictionary to store events {date: {cell_address: event_data}}
+        self._last_fmt_idx = 0  # Index of the last format that parsed successfully
+        self._fmt_order = list(range(len(_DATE_FORMATS)))  # Format indices, most used first
+        self._fmt_hits = [0] * len(_DATE_FORMATS)
+        self._fmt_calls = 0
+        self._parse_date_string = lru_cache(maxsize=4096)(self._match_date_formats)
+        self._date_index = None  # {date: [(row, column), ...]} of bare date cells, built on demand
+        self._cell_buffers = {}  # Pending cell lines {cell_address: [line, ...]}, written on save
+        self._cell_styles = {}  # Pending event styles {cell_address: style_name}, applied on save
+        self._next_free_row = 1  # First empty row for new date cells, set when the sheet is loaded
         
         self.event_styles = {
             'default': {
@@ -130,6 +154,7 @@ class ExcelCalendarManager:
                 'font': Font(bold=True, color="000000")
             }
         }
+        self._event_alignment = Alignment(wrap_text=True, vertical='top')
         
         self._load_workbook()
         self._rebuild_events_from_sheet()
@@ -147,6 +172,8 @@ class ExcelCalendarManager:
                 logger.info(f"Created new calendar sheet: {self.calendar_sheet_name}")
             else:
                 self.calendar_sheet = self.workbook[self.calendar_sheet_name]            
+            self._date_index = None
+            self._next_free_row = self.calendar_sheet.max_row + 1
             logger.info(f"Successfully loaded workbook: {self.workbook_path}")
             
         except Exception as e:
@@ -155,12 +182,13 @@ class ExcelCalendarManager:
     def extract_dates(self) -> Dict[str, datetime]:
         date_cells = {}
         try:
-            for row in self.calendar_sheet.iter_rows():
-                for cell in row:
-                    if cell.value is not None:
-                        date_obj = self._parse_date(cell.value)
+            self._flush_cell_buffers()
+            for row_idx, row in enumerate(self.calendar_sheet.iter_rows(values_only=True), 1):
+                for col_idx, value in enumerate(row, 1):
+                    if value is not None:
+                        date_obj = self._parse_date(value)
                         if date_obj:
-                            cell_address = f"{get_column_letter(cell.column)}{cell.row}"
+                            cell_address = f"{get_column_letter(col_idx)}{row_idx}"
                             date_cells[cell_address] = date_obj
                             logger.debug(f"Found date in {cell_address}: {date_obj}")
             
@@ -171,6 +199,33 @@ class ExcelCalendarManager:
             logger.error(f"Error extracting dates: {str(e)}")
             return {}
     
+    def _ensure_date_index(self) -> Dict[date, List[Tuple[int, int]]]:
+        """Build the date -> cell positions index with a single pass over the sheet."""
+        if self._date_index is None:
+            self._flush_cell_buffers()
+            self._date_index = {}
+            for row_idx, row in enumerate(self.calendar_sheet.iter_rows(values_only=True), 1):
+                for col_idx, value in enumerate(row, 1):
+                    if value is not None:
+                        date_obj = self._parse_date(value)
+                        if date_obj:
+                            self._date_index.setdefault(date_obj.date(), []).append((row_idx, col_idx))
+        return self._date_index
+    
+    def _update_date_index(self, cell: openpyxl.cell.Cell, old_value: Any, new_value: Any) -> None:
+        """Keep the date index in step with a cell whose value changed from old_value to new_value."""
+        if self._date_index is None:
+            return
+        position = (cell.row, cell.column)
+        old_date = self._parse_date(old_value) if old_value is not None else None
+        if old_date:
+            positions = self._date_index.get(old_date.date(), [])
+            if position in positions:
+                positions.remove(position)
+        new_date = self._parse_date(new_value) if new_value is not None else None
+        if new_date:
+            bisect.insort(self._date_index.setdefault(new_date.date(), []), position)
+    
     def _parse_date(self, value: Any) -> Optional[datetime]:
         """
         Parse various date formats into datetime objects.
@@ -186,17 +241,39 @@ class ExcelCalendarManager:
         elif isinstance(value, date):
             return datetime.combine(value, datetime.min.time())
         elif isinstance(value, str):
-            # Try common date formats
-            date_formats = [
-                "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y",
-                "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M:%S"
-            ]
-            
-            for fmt in date_formats:
-                try:
-                    return datetime.strptime(value.strip(), fmt)
-                except ValueError:
-                    continue
+            if not _DATE_HINT.match(value):
+                return None
+            return self._parse_date_string(value)
+        
+        return None
+    
+    def _match_date_formats(self, value: str) -> Optional[datetime]:
+        """
+        Try the known date formats against a string, starting with the last one that matched.
+        
+        The remaining formats are tried by descending hit count, re-sorted every
+        _FORMAT_REORDER_INTERVAL calls. Month-first is never promoted or sorted ahead
+        of day-first, so ambiguous strings such as 03/04/2025 resolve day-first. Results are
+        memoized per manager through self._parse_date_string.
+        """
+        self._fmt_calls += 1
+        if self._fmt_calls % _FORMAT_REORDER_INTERVAL == 0:
+            self._fmt_order.sort(key=lambda i: -self._fmt_hits[i])
+            # Keep month-first directly behind day-first whatever their hit counts
+            self._fmt_order.remove(_MONTH_FIRST_IDX)
+            self._fmt_order.insert(self._fmt_order.index(_DAY_FIRST_IDX) + 1, _MONTH_FIRST_IDX)
+        
+        text = value.strip()
+        first = self._last_fmt_idx
+        for idx in [first] + [i for i in self._fmt_order if i != first]:
+            try:
+                date_obj = datetime.strptime(text, _DATE_FORMATS[idx])
+            except ValueError:
+                continue
+            if idx != _MONTH_FIRST_IDX:
+                self._last_fmt_idx = idx
+            self._fmt_hits[idx] += 1
+            return date_obj
         
         return None
     
@@ -224,6 +301,7 @@ class ExcelCalendarManager:
             # Find or create cell for the date
             if cell_address:
                 target_cell = self.calendar_sheet[cell_address]
+                self._next_free_row = max(self._next_free_row, target_cell.row + 1)
             else:
                 target_cell = self._find_or_create_date_cell(date_obj)
             
@@ -239,13 +317,18 @@ class ExcelCalendarManager:
                 'datetime': date_obj
             }
             
-            # Update cell content and apply styling
-            if target_cell.value and isinstance(target_cell.value, str):
-                target_cell.value = f"{target_cell.value}\n{event_title}"
-            else:
-                target_cell.value = f"{date_obj.strftime('%Y-%m-%d')}\n{event_title}"
-            
-            self._apply_event_style(target_cell, style)
+            # Buffer cell content and styling; both are written to the sheet on save
+            old_value = self._cell_value(target_cell)
+            parts = self._cell_buffers.get(cell_addr)
+            if not parts:
+                if old_value and isinstance(old_value, str):
+                    parts = old_value.split('\n')
+                else:
+                    parts = [date_obj.strftime('%Y-%m-%d')]
+                self._cell_buffers[cell_addr] = parts
+            parts.append(event_title)
+            self._cell_styles[cell_addr] = style
+            self._update_date_index(target_cell, old_value, "\n".join(parts))
             
             logger.info(f"Added event '{event_title}' to {date_key} at {cell_addr}")
             return True
@@ -257,24 +340,45 @@ class ExcelCalendarManager:
     def _find_or_create_date_cell(self, date_obj: datetime) -> openpyxl.cell.Cell:
         """Find existing date cell or create a new one."""
         # First, try to find existing date cell
-        date_cells = self.extract_dates()
-        for cell_addr, cell_date in date_cells.items():
-            if cell_date.date() == date_obj.date():
-                return self.calendar_sheet[cell_addr]
+        positions = self._ensure_date_index().get(date_obj.date())
+        if positions:
+            row, column = positions[0]
+            return self.calendar_sheet.cell(row=row, column=column)
         
         # Create new cell in next available row
-        next_row = self.calendar_sheet.max_row + 1
-        target_cell = self.calendar_sheet.cell(row=next_row, column=1)
+        target_cell = self.calendar_sheet.cell(row=self._next_free_row, column=1)
+        self._next_free_row += 1
         target_cell.value = date_obj.strftime("%Y-%m-%d")
+        self._update_date_index(target_cell, None, target_cell.value)
         
         return target_cell
     
+    def _cell_value(self, cell: openpyxl.cell.Cell) -> Any:
+        """Return a calendar cell's value, including buffered edits not yet written to the sheet."""
+        parts = self._cell_buffers.get(cell.coordinate)
+        return "\n".join(parts) if parts is not None else cell.value
+    
+    def _cell_lines(self, cell_addr: str, value: str) -> List[str]:
+        """Return the buffered lines (date header, then event titles) of a cell holding value."""
+        if cell_addr not in self._cell_buffers:
+            self._cell_buffers[cell_addr] = value.split('\n')
+        return self._cell_buffers[cell_addr]
+    
+    def _flush_cell_buffers(self) -> None:
+        """Write buffered event lines and styles to the calendar sheet."""
+        for cell_addr, parts in self._cell_buffers.items():
+            self.calendar_sheet[cell_addr].value = "\n".join(parts)
+        for cell_addr, style in self._cell_styles.items():
+            self._apply_event_style(self.calendar_sheet[cell_addr], style)
+        self._cell_buffers.clear()
+        self._cell_styles.clear()
+    
     def _apply_event_style(self, cell: openpyxl.cell.Cell, style_name: str) -> None:
         """Apply styling to an event cell."""
         style = self.event_styles.get(style_name, self.event_styles['default'])
         cell.fill = style['fill']
         cell.font = style['font']
-        cell.alignment = Alignment(wrap_text=True, vertical='top')
+        cell.alignment = self._event_alignment
     
     def update_event(self, target_date: str, old_title: str, new_title: str) -> bool:
         """
@@ -299,8 +403,15 @@ class ExcelCalendarManager:
                     
                     # Update cell content
                     cell = self.calendar_sheet[cell_addr]
-                    if cell.value:
-                        cell.value = cell.value.replace(old_title, new_title)
+                    old_value = self._cell_value(cell)
+                    if old_value and isinstance(old_value, str):
+                        # Edit whole event lines so titles that merely contain old_title are left intact
+                        parts = self._cell_lines(cell_addr, old_value)
+                        for idx in range(1, len(parts)):
+                            if parts[idx].strip() == old_title:
+                                parts[idx] = new_title
+                                break
+                        self._update_date_index(cell, old_value, "\n".join(parts))
                     
                     logger.info(f"Updated event from '{old_title}' to '{new_title}' on {target_date}")
                     return True
@@ -335,12 +446,18 @@ class ExcelCalendarManager:
                     
                     # Update cell content
                     cell = self.calendar_sheet[cell_addr]
-                    if cell.value:
-                        cell.value = cell.value.replace(f"\n{event_title}", "")
-                        cell.value = cell.value.replace(event_title, "")
+                    old_value = self._cell_value(cell)
+                    if old_value and isinstance(old_value, str):
+                        parts = self._cell_lines(cell_addr, old_value)
+                        for idx in range(1, len(parts)):
+                            if parts[idx].strip() == event_title:
+                                del parts[idx]
+                                break
+                        self._update_date_index(cell, old_value, "\n".join(parts))
                     
                     # Reset styling if no more events
                     if not self.events[target_date]:
+                        self._cell_styles.pop(cell_addr, None)
                         cell.fill = PatternFill()
                         cell.font = Font()
                         del self.events[target_date]
@@ -375,14 +492,21 @@ class ExcelCalendarManager:
             
             dates_list = self._parse_dates_file(dates_path)
             
-            for date_str in dates_list:
+            # Parse each distinct date string only once
+            parsed_dates = {}
+            for date_str in set(dates_list):
                 try:
-                    date_obj = datetime.strptime(date_str.strip(), "%Y-%m-%d")
-                    if self.add_event(date_obj, default_event_title):
-                        added_count += 1
+                    parsed_dates[date_str] = datetime.strptime(date_str.strip(), "%Y-%m-%d")
                 except ValueError:
+                    parsed_dates[date_str] = None
+            
+            for date_str in dates_list:
+                date_obj = parsed_dates[date_str]
+                if date_obj is None:
                     logger.warning(f"Invalid date format: {date_str}")
                     continue
+                if self.add_event(date_obj, default_event_title):
+                    added_count += 1
             
             logger.info(f"Batch added {added_count} events from {dates_file}")
             return added_count
@@ -417,19 +541,21 @@ class ExcelCalendarManager:
             # Create or get summary sheet
             summary_sheet_name = "Event Summary"
             if summary_sheet_name in self.workbook.sheetnames:
-                summary_sheet = self.workbook[summary_sheet_name]
-                # Clear existing content
-                summary_sheet.delete_rows(1, summary_sheet.max_row)
+                # Replace the existing sheet so rows are appended from the top again
+                sheet_index = self.workbook.sheetnames.index(summary_sheet_name)
+                del self.workbook[summary_sheet_name]
+                summary_sheet = self.workbook.create_sheet(summary_sheet_name, sheet_index)
             else:
                 summary_sheet = self.workbook.create_sheet(summary_sheet_name)
             
             # Headers
             headers = ["Date", "Event Title", "Cell Address", "Link to Calendar"]
-            for col, header in enumerate(headers, 1):
-                cell = summary_sheet.cell(row=1, column=col)
-                cell.value = header
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+            summary_sheet.append(headers)
+            header_font = Font(bold=True)
+            header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+            for cell in summary_sheet[1]:
+                cell.font = header_font
+                cell.fill = header_fill
             
             # Sort events by date and populate summary
             all_events = []
@@ -445,30 +571,27 @@ class ExcelCalendarManager:
             # Sort by datetime
             all_events.sort(key=lambda x: x['datetime'])
             
-            # Populate summary sheet
-            for row, event in enumerate(all_events, 2):
-                summary_sheet.cell(row=row, column=1).value = event['date']
-                summary_sheet.cell(row=row, column=2).value = event['title']
-                summary_sheet.cell(row=row, column=3).value = event['cell_address']
-                
-                # Create hyperlink to calendar cell
-                link_cell = summary_sheet.cell(row=row, column=4)
-                link_cell.value = "Go to Calendar"
-                link_cell.hyperlink = f"#{self.calendar_sheet_name}!{event['cell_address']}"
-                link_cell.font = Font(color="0000FF", underline="single")
+            # Populate summary sheet, tracking column widths as rows are written
+            col_widths = [len(header) for header in headers]
+            for event in all_events:
+                row_values = (event['date'], event['title'], event['cell_address'], "Go to Calendar")
+                summary_sheet.append(row_values)
+                for idx, value in enumerate(row_values):
+                    col_widths[idx] = max(col_widths[idx], len(str(value)))
+            
+            # Create hyperlinks to calendar cells in one pass over the link column
+            if all_events:
+                link_prefix = f"#{self.calendar_sheet_name}!"
+                link_font = Font(color="0000FF", underline="single")
+                link_cells = summary_sheet[f"D2:D{len(all_events) + 1}"]
+                for (link_cell,), event in zip(link_cells, all_events):
+                    link_cell.hyperlink = link_prefix + event['cell_address']
+                    link_cell.font = link_font
             
             # Auto-adjust column widths
-            for column in summary_sheet.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
+            for col, max_length in enumerate(col_widths, 1):
                 adjusted_width = min(max_length + 2, 50)
-                summary_sheet.column_dimensions[column_letter].width = adjusted_width
+                summary_sheet.column_dimensions[get_column_letter(col)].width = adjusted_width
             
             logger.info(f"Generated summary sheet with {len(all_events)} events")
             
@@ -487,6 +610,7 @@ class ExcelCalendarManager:
         """
         try:
             save_path = Path(output_path) if output_path else self.workbook_path
+            self._flush_cell_buffers()
             self.workbook.save(save_path)
             logger.info(f"Saved workbook to: {save_path}")
             return True
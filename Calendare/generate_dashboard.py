@@ -1,78 +1,248 @@
 import os
+import warnings
+import zipfile
+from xml.etree import ElementTree
+from datetime import date, datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 import pandas as pd
 from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.styles import PatternFill
 from openpyxl.formatting.rule import CellIsRule
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.worksheet.filters import AutoFilter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+import matplotlib
+matplotlib.use("Agg")  # Charts are only saved to files; skip interactive backend start-up
 import matplotlib.pyplot as plt
 
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None  # Fall back to openpyxl's read-only reader
+
+# Chart axes reused across dashboards, created on first use
+_chart_ax = None
+
+# Explicit formats tried for dates that are not ISO-8601, before falling back to inference
+_CALENDAR_DATE_FORMATS = ("%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y")
+
+# Namespace of xl/workbook.xml, read to find the active tab for calamine
+_SPREADSHEETML_NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+def _parse_calendar_dates(df):
+    # Pick the event date column: first header mentioning 'date', else the first column
+    date_col = next((c for c in df.columns if 'date' in str(c).lower()), None)
+    named = date_col is not None
+    if not named:
+        date_col = df.columns[0]
+    # Blank headers all read as None, so only a uniquely labelled column can be converted
+    if df.columns.tolist().count(date_col) != 1:
+        return df
+    values = df[date_col]
+    # Only text and date cells can hold dates; numbers would parse as epoch offsets
+    if not values[values.notna()].map(lambda v: isinstance(v, (str, date))).all():
+        return df
+    # ISO strings and datetime cells are converted by pandas' C parser in one pass
+    parsed = pd.to_datetime(values, format="%Y-%m-%d", cache=True, errors="coerce")
+    for fmt in _CALENDAR_DATE_FORMATS + (None,):
+        unparsed = parsed.isna() & values.notna()
+        if not unparsed.any():
+            break
+        with warnings.catch_warnings():
+            # The inference pass (fmt=None) warns for every non-date text column it is given
+            warnings.filterwarnings("ignore", "Could not infer format", UserWarning)
+            parsed[unparsed] = pd.to_datetime(values[unparsed], format=fmt, cache=True, errors="coerce")
+    # Only convert when every non-empty value is a date, so other columns are left untouched
+    if (parsed.isna() & values.notna()).any():
+        return df
+    df[date_col] = parsed
+    # The first-column fallback is only a guess, so keep its blank rows
+    if not named:
+        return df
+    # Rows without an event date have nothing to place on the calendar
+    return df[parsed.notna()].reset_index(drop=True)
+
+def _active_sheet_name(fpath):
+    # Calamine has no notion of the selected tab, so read it from the workbook part as openpyxl does
+    try:
+        with zipfile.ZipFile(fpath) as zf:
+            root = ElementTree.fromstring(zf.read('xl/workbook.xml'))
+    except (KeyError, ElementTree.ParseError):
+        return None  # Unusual package layout: the caller falls back to the first sheet
+    view = root.find('m:bookViews/m:workbookView', _SPREADSHEETML_NS)
+    index = int(view.get('activeTab', 0)) if view is not None else 0
+    sheets = root.findall('m:sheets/m:sheet', _SPREADSHEETML_NS)
+    return sheets[index].get('name') if index < len(sheets) else None
+
+def _normalize_cell(v):
+    # '' counts as empty (calamine cannot tell it from a blank cell), whole-number floats
+    # (calamine's 2025.0) become ints and date-only cells become datetimes, as openpyxl returns them
+    if v == '':
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    if type(v) is date:
+        return datetime(v.year, v.month, v.day)
+    return v
+
+def _normalize_sheet_rows(rows):
+    # Make calamine and openpyxl agree cell by cell, then drop trailing empty rows/columns
+    rows = [tuple(_normalize_cell(v) for v in row) for row in rows]
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()
+    width = max((i + 1 for row in rows for i, v in enumerate(row) if v is not None), default=0)
+    return [row[:width] + (None,) * (width - len(row)) for row in rows]
+
+def _read_calendar_rows(fpath, sheet_name=None):
+    # Returns the header and the data rows (as tuples) of a calendar sheet
+    if CalamineWorkbook is not None:
+        wb = CalamineWorkbook.from_path(fpath)
+        if not (sheet_name and sheet_name in wb.sheet_names):
+            # Default to the active tab, like the openpyxl path's wb.active
+            sheet_name = _active_sheet_name(fpath)
+        if sheet_name in wb.sheet_names:
+            ws = wb.get_sheet_by_name(sheet_name)
+        else:
+            ws = wb.get_sheet_by_index(0)
+        rows = ws.to_python(skip_empty_area=False)
+        wb.close()
+    else:
+        wb = load_workbook(fpath, read_only=True, data_only=True)
+        if sheet_name and sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+        else:
+            ws = wb.active
+        rows = list(ws.iter_rows(values_only=True))
+        wb.close()
+    rows = _normalize_sheet_rows(rows)
+    return list(rows[0]), rows[1:]
+
+def _read_one(fpath, sheet_name=None):
+    # Worker entry point: reports errors as text so one bad file does not stop the others
+    try:
+        return _read_calendar_rows(fpath, sheet_name), None
+    except Exception as e:
+        return None, str(e)
+
 def extract_and_consolidate_calendars(folder, sheet_name=None):
-    all_data = []
-    for fname in os.listdir(folder):
-        if fname.endswith('.xlsx') and not fname.startswith('~$'):
-            fpath = os.path.join(folder, fname)
-            try:
-                wb = load_workbook(fpath, data_only=True)
-                if sheet_name and sheet_name in wb.sheetnames:
-                    ws = wb[sheet_name]
-                else:
-                    ws = wb.active
-                data = ws.values
-                cols = next(data)
-                df = pd.DataFrame(data, columns=cols)
-                df['SourceFile'] = fname
-                all_data.append(df)
-            except Exception as e:
-                print(f"Error reading {fname}: {e}")
-    if all_data:
-        return pd.concat(all_data, ignore_index=True)
-    return pd.DataFrame()
+    fnames = [f for f in os.listdir(folder) if f.endswith('.xlsx') and not f.startswith('~$')]
+    paths = [os.path.join(folder, fname) for fname in fnames]
+    # Each workbook parses independently, so spread the files over worker processes
+    read_one = partial(_read_one, sheet_name=sheet_name)
+    workers = min(len(paths), os.cpu_count() or 1)
+    results = None
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                results = list(ex.map(read_one, paths))
+        except BrokenProcessPool:
+            # Spawned workers re-run an unguarded __main__ and die; read the files here instead
+            results = None
+    if results is None:
+        results = list(map(read_one, paths))
+    columns = []
+    layouts = {}  # header tuple -> target column positions
+    rows = []
+    sources = []
+    for fname, (data, error) in zip(fnames, results):
+        if error is not None:
+            print(f"Error reading {fname}: {error}")
+            continue
+        cols, file_rows = data
+        # SourceFile is filled in below, replacing any column of that name in the file
+        keep = [i for i, c in enumerate(cols) if c != 'SourceFile']
+        if len(keep) < len(cols):
+            cols = [cols[i] for i in keep]
+            file_rows = [tuple(row[i] for i in keep) for row in file_rows]
+        # Files sharing a header layout line up by position
+        targets = layouts.get(tuple(cols))
+        if targets is None:
+            if not layouts:
+                columns.extend(cols)
+                targets = list(range(len(cols)))
+            elif len(set(cols)) == len(cols) and len(set(columns)) == len(columns):
+                # Distinct headers on both sides: line columns up by name
+                targets = []
+                for c in cols:
+                    if c not in columns:
+                        columns.append(c)
+                    targets.append(columns.index(c))
+            else:
+                # Repeated headers (blank cells all read as None) cannot be matched by name
+                targets = list(range(len(columns), len(columns) + len(cols)))
+                columns.extend(cols)
+            layouts[tuple(cols)] = targets
+        if targets != list(range(len(cols))):
+            width = len(columns)
+            aligned = []
+            for row in file_rows:
+                out = [None] * width
+                for target, value in zip(targets, row):
+                    out[target] = value
+                aligned.append(tuple(out))
+            file_rows = aligned
+        rows.extend(file_rows)
+        sources.extend([fname] * len(file_rows))
+    if not layouts:
+        return pd.DataFrame()
+    width = len(columns)
+    if any(len(row) < width for row in rows):
+        rows = [row + (None,) * (width - len(row)) for row in rows]
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    df['SourceFile'] = sources
+    return _parse_calendar_dates(df)
 
 def write_master_calendar_excel(df, out_path):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Consolidated Calendar'
+    # Write-only mode streams rows to disk instead of keeping every cell in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Consolidated Calendar')
     for r in dataframe_to_rows(df, index=False, header=True):
         ws.append(r)
-    tab = Table(displayName="CalendarTable", ref=ws.dimensions)
+    # Write-only sheets have no dimensions, so the table range comes from the frame
+    tab = Table(displayName="CalendarTable", ref=f"A1:{get_column_letter(len(df.columns))}{len(df) + 1}")
+    # Write-only mode cannot read the header cells back, so name the table columns explicitly
+    tab.tableColumns = [TableColumn(id=i, name=str(c)) for i, c in enumerate(df.columns, 1)]
+    tab.autoFilter = AutoFilter(ref=tab.ref)  # openpyxl only adds the header filter when it builds the columns
     style = TableStyleInfo(name="TableStyleMedium9", showRowStripes=True)
     tab.tableStyleInfo = style
-    ws.add_table(tab)
+    with warnings.catch_warnings():
+        # Raised for every write-only table, even when the columns are already named
+        warnings.filterwarnings("ignore", "In write-only mode you must add table columns manually")
+        ws.add_table(tab)
     wb.save(out_path)
 
-def add_calendar_pivot_and_chart(excel_path, pivot_col, value_col):
-    wb = load_workbook(excel_path)
-    ws = wb['Consolidated Calendar']
+def add_calendar_pivot_and_chart(wb, df, pivot_col, value_col):
     if 'Summary' in wb.sheetnames:
         del wb['Summary']
     summary = wb.create_sheet('Summary')
-    df = pd.DataFrame(ws.values)
-    df.columns = df.iloc[0]
-    df = df[1:]
     pivot = df.groupby(pivot_col)[value_col].count().reset_index()
     for r in dataframe_to_rows(pivot, index=False, header=True):
         summary.append(r)
     max_row = summary.max_row
-    summary.conditional_formatting.add(f'B2:B{max_row}',
-        CellIsRule(operator='greaterThan', formula=[f'LARGE(B2:B{max_row},ROUND(COUNT(B2:B{max_row})*0.1,0))'], fill=PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')))
-    wb.save(excel_path)
-
-def add_calendar_chart_image(excel_path, pivot_col, value_col):
-    wb = load_workbook(excel_path)
-    ws = wb['Summary']
-    data = list(ws.values)
-    cols = data[0]
-    df = pd.DataFrame(data[1:], columns=cols)
-    plt.figure(figsize=(8,4))
-    plt.bar(df[pivot_col], pd.to_numeric(df[value_col], errors='coerce'))
-    plt.title(f'{value_col} count by {pivot_col}')
-    plt.ylabel(f'Count of {value_col}')
-    plt.xticks(rotation=45)
-    img_path = excel_path.replace('.xlsx', '_calendar_chart.png')
-    plt.tight_layout()
-    plt.savefig(img_path)
-    plt.close()
+    # Threshold is computed here so Excel compares against a constant instead of re-running LARGE/COUNT
+    threshold = float(pivot[value_col].quantile(0.9))
+    if pd.notna(threshold):
+        summary.conditional_formatting.add(f'B2:B{max_row}',
+            CellIsRule(operator='greaterThan', formula=[repr(threshold)], fill=PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')))
+    return pivot
+
+def add_calendar_chart_image(pivot, pivot_col, value_col, img_path):
+    global _chart_ax
+    if _chart_ax is None:
+        _, _chart_ax = plt.subplots(figsize=(8,4))
+    else:
+        _chart_ax.clear()
+    # Pivot counts are already integers, no numeric coercion needed
+    _chart_ax.bar(pivot[pivot_col], pivot[value_col])
+    _chart_ax.set_title(f'{value_col} count by {pivot_col}')
+    _chart_ax.set_ylabel(f'Count of {value_col}')
+    _chart_ax.tick_params(axis='x', labelrotation=45)
+    fig = _chart_ax.figure
+    fig.tight_layout()
+    fig.savefig(img_path, dpi=100)
     return img_path
 
 def save_calendar_as_pdf(excel_path, pdf_path):
@@ -95,12 +265,17 @@ def generate_calendar_dashboard(folder, sheet_name=None, pivot_col='SourceFile',
         value_col = df.columns[1]  # Guess a main event/column
     master_path = os.path.join(folder, 'MasterCalendarDashboard.xlsx')
     write_master_calendar_excel(df, master_path)
-    add_calendar_pivot_and_chart(master_path, pivot_col, value_col)
-    chart_img = add_calendar_chart_image(master_path, pivot_col, value_col)
+    # Reopen the master once for all post-processing steps and save it a single time
+    wb = load_workbook(master_path)
+    pivot = add_calendar_pivot_and_chart(wb, df, pivot_col, value_col)
+    img_path = master_path.replace('.xlsx', '_calendar_chart.png')
+    chart_img = add_calendar_chart_image(pivot, pivot_col, value_col, img_path)
+    wb.save(master_path)
     pdf_path = master_path.replace('.xlsx', '.pdf')
     save_calendar_as_pdf(master_path, pdf_path)
     print(f"Calendar dashboard saved as {master_path} and {pdf_path}")
     print(f"Chart image: {chart_img}")
 
-# Example usage:
-# generate_calendar_dashboard('path_to_calendare_folder', sheet_name='Calendar', pivot_col='SourceFile', value_col='Event Title')
+# Example usage (the __main__ guard lets the file reader start worker processes on Windows/macOS):
+# if __name__ == '__main__':
+#     generate_calendar_dashboard('path_to_calendare_folder', sheet_name='Calendar', pivot_col='SourceFile', value_col='Event Title')
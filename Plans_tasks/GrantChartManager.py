@@ -6,6 +6,7 @@ import argparse
 import logging
 import os
 import sys
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
@@ -38,12 +39,13 @@ class ProjectVisualizer:
             
             self.logger.info(f"Loading data from {self.file_path} (sheet: {self.sheet_name})")
             
-            # Load workbook
-            wb = load_workbook(self.file_path, data_only=True)
+            # Load workbook (read-only streams the sheet XML instead of building the full object model)
+            wb = load_workbook(self.file_path, read_only=True, data_only=True)
             
             # Verify sheet exists
             if self.sheet_name not in wb.sheetnames:
                 available_sheets = ", ".join(wb.sheetnames)
+                wb.close()
                 raise ValueError(
                     f"Sheet '{self.sheet_name}' not found. "
                     f"Available sheets: {available_sheets}"
@@ -55,51 +57,37 @@ class ProjectVisualizer:
             # Find data starting row (Vertex42 templates start at row 6)
             START_ROW = 6
             data = []
-            row_index = START_ROW
+            raw_preds = []
             
-            while True:
-                # Get task cell (column B)
-                task_cell = f'B{row_index}'
-                task_value = sheet[task_cell].value
+            # Read columns B-G (task, assigned to, progress, start, end, predecessors) in one pass
+            rows = sheet.iter_rows(min_row=START_ROW, min_col=2, max_col=7, values_only=True)
+            for row_index, row in enumerate(rows, START_ROW):
+                task_value, assigned_to, progress, start_date, end_date, predecessors = row
                 
                 # Stop when we find an empty task cell
                 if not task_value:
                     break
                 
-                # Get other values
-                assigned_to = sheet[f'C{row_index}'].value
-                progress = sheet[f'D{row_index}'].value
-                start_date = sheet[f'E{row_index}'].value
-                end_date = sheet[f'F{row_index}'].value
-                # New: Read Predecessors (column G)
-                predecessors = sheet[f'G{row_index}'].value
-                
                 # Skip section headers (rows without dates)
                 if not start_date:
-                    row_index += 1
                     continue
                 
-                # Parse predecessors as list of row numbers or task names
-                pred_list = []
-                if predecessors:
-                    for pred in str(predecessors).split(','):
-                        pred = pred.strip()
-                        if pred:
-                            pred_list.append(pred)
-                
-                data.append({
-                    'Task': task_value,
-                    'Assigned To': assigned_to,
-                    'Progress': progress,
-                    'Start': start_date,
-                    'End': end_date,
-                    'Row': row_index,  # Track row for dependency mapping
-                    'Predecessors': pred_list
-                })
-                
-                row_index += 1
+                # Row is kept for dependency mapping; predecessors are parsed after the scan
+                data.append((task_value, assigned_to, progress, start_date, end_date, row_index))
+                raw_preds.append(predecessors)
+            wb.close()
             
-            self.df = pd.DataFrame(data)
+            self.df = pd.DataFrame.from_records(
+                data,
+                columns=['Task', 'Assigned To', 'Progress', 'Start', 'End', 'Row']
+            )
+            # Parse predecessors as list of row numbers or task names; object dtype keeps
+            # numeric row references as ints (6, not 6.0) when some cells are blank
+            raw_preds = pd.Series(raw_preds, index=self.df.index, dtype=object)
+            raw_preds = raw_preds.where(raw_preds.notna() & raw_preds.astype(bool), '').astype(str).str.strip()
+            self.df['Predecessors'] = raw_preds.str.split(r'\s*,\s*', regex=True).map(
+                lambda preds: [pred for pred in preds if pred]
+            )
             self.logger.info(f"Loaded {len(self.df)} tasks (with dependencies)")
             return True
             
@@ -128,51 +116,56 @@ class ProjectVisualizer:
             if not dupes.empty:
                 self.logger.warning(f"Duplicate tasks found: {dupes['Task'].tolist()}")
                 self.df = self.df.drop_duplicates(['Task'], keep='first')
-            # Remove rows with missing required fields
+            # Remove rows with missing required fields or invalid dates
             required_fields = ['Task', 'Start', 'End']
             before = len(self.df)
-            self.df = self.df.dropna(subset=required_fields)
-            after = len(self.df)
-            if after < before:
-                self.logger.warning(f"Removed {before - after} tasks missing required fields (Task, Start, End)")
-            # Convert dates with error handling
-            self.df['Start'] = pd.to_datetime(self.df['Start'], errors='coerce')
-            self.df['End'] = pd.to_datetime(self.df['End'], errors='coerce')
-            # Remove rows with invalid dates
-            initial_count = len(self.df)
-            self.df = self.df.dropna(subset=['Start', 'End'])
-            removed_count = initial_count - len(self.df)
-            if removed_count > 0:
-                self.logger.warning(f"Removed {removed_count} tasks with invalid dates")
+            missing = int(self.df[required_fields].isna().any(axis=1).sum())
+            # Coerce dates and progress together, then drop unusable rows in one pass
+            self.df = self.df.assign(
+                Start=pd.to_datetime(self.df['Start'], errors='coerce'),
+                End=pd.to_datetime(self.df['End'], errors='coerce'),
+                Progress=pd.to_numeric(self.df['Progress'], errors='coerce')
+            ).dropna(subset=required_fields)
+            invalid = before - len(self.df) - missing
+            if missing > 0:
+                self.logger.warning(f"Removed {missing} tasks missing required fields (Task, Start, End)")
+            if invalid > 0:
+                self.logger.warning(f"Removed {invalid} tasks with invalid dates")
             # Normalize progress: accept 0-1 or 0-100
-            self.df['Progress'] = pd.to_numeric(self.df['Progress'], errors='coerce')
-            if self.df['Progress'].max() > 1:
-                self.df['Progress'] = self.df['Progress'] / 100.0
-            self.df['Progress'] = self.df['Progress'].clip(0, 1)
-            self.df['Assigned To'].fillna('Unassigned', inplace=True)
-            self.df['Progress'].fillna(0, inplace=True)
+            progress = self.df['Progress']
+            if progress.max() > 1:
+                progress = progress / 100.0
+            self.df = self.df.assign(Progress=progress.clip(0, 1)).fillna({'Assigned To': 'Unassigned', 'Progress': 0})
             # Fix end dates that are before start dates
-            invalid_dates = self.df[self.df['End'] < self.df['Start']]
-            if not invalid_dates.empty:
-                self.logger.warning(f"Fixed {len(invalid_dates)} tasks with end date before start date")
-                self.df.loc[self.df['End'] < self.df['Start'], 'End'] = self.df['Start']
+            start = self.df['Start'].to_numpy()
+            end = self.df['End'].to_numpy()
+            fixed = int((end < start).sum())
+            if fixed:
+                self.logger.warning(f"Fixed {fixed} tasks with end date before start date")
+                self.df['End'] = np.maximum(start, end)
             # Calculate durations
             self.df['Duration'] = (self.df['End'] - self.df['Start']).dt.days + 1
-            self.df['Completed End'] = self.df['Start'] + pd.to_timedelta(
-                (self.df['Duration'] * self.df['Progress']).astype(int), 
-                unit='d'
-            )
+            # Completed span as whole days; the Gantt bar takes it as-is
+            self.df['CompletedDays'] = (self.df['Duration'] * self.df['Progress']).astype('int32')
+            # Narrow the numeric columns now that the float64 arithmetic is done
+            self.df['Progress'] = self.df['Progress'].astype('float32')
+            self.df['Duration'] = self.df['Duration'].astype('int32')
+            self.df['Row'] = self.df['Row'].astype('int32')
             # Validate Predecessors: warn if any do not exist
             all_tasks = set(self.df['Task'])
             all_rows = set(self.df['Row'])
-            for idx, row in self.df.iterrows():
-                for pred in row['Predecessors']:
-                    if pred.isdigit():
-                        if int(pred) not in all_rows:
-                            self.logger.warning(f"Task '{row['Task']}' has non-existent predecessor row: {pred}")
-                    else:
-                        if pred not in all_tasks:
-                            self.logger.warning(f"Task '{row['Task']}' has non-existent predecessor task: {pred}")
+            # One (task, predecessor) pair per row, checked with two vectorized isin calls
+            refs = self.df[['Task', 'Predecessors']].explode('Predecessors').dropna(subset=['Predecessors'])
+            preds = refs['Predecessors'].astype(str)
+            is_row_ref = preds.str.isdigit().to_numpy(dtype=bool)
+            missing = np.where(
+                is_row_ref,
+                ~preds.where(is_row_ref, '0').astype(int).isin(all_rows).to_numpy(),
+                ~preds.isin(all_tasks).to_numpy()
+            )
+            for task, pred, row_ref in zip(refs['Task'][missing], preds[missing], is_row_ref[missing]):
+                kind = 'row' if row_ref else 'task'
+                self.logger.warning(f"Task '{task}' has non-existent predecessor {kind}: {pred}")
             self.validated = True
             self.logger.info("Data validation and cleaning complete")
             return True
@@ -180,7 +173,7 @@ class ProjectVisualizer:
             self.logger.error(f"Validation error: {str(e)}")
             return False
     
-    def create_gantt_chart(self, output_dir):
+    def create_gantt_chart(self, output_dir, emit_png=False):
         """Create an interactive Gantt chart visualization with dependency arrows"""
         if not self.validated:
             self.logger.error("Data not validated")
@@ -200,22 +193,22 @@ class ProjectVisualizer:
                 orientation='h',
                 name='Planned',
                 marker=dict(color='rgba(100,100,100,0.3)'),
-                hoverinfo='text',
-                hovertext=[
-                    f"<b>{row['Task']}</b><br>"
-                    f"Owner: {row['Assigned To']}<br>"
-                    f"Start: {row['Start'].strftime('%Y-%m-%d')}<br>"
-                    f"End: {row['End'].strftime('%Y-%m-%d')}<br>"
-                    f"Progress: {row['Progress']*100:.0f}%"
-                    for _, row in self.df.iterrows()
-                ]
+                # Hover labels are formatted by plotly.js from the raw values
+                customdata=self.df[['Assigned To', 'End', 'Progress']].to_numpy(),
+                hovertemplate=(
+                    "<b>%{y}</b><br>"
+                    "Owner: %{customdata[0]}<br>"
+                    "Start: %{base|%Y-%m-%d}<br>"
+                    "End: %{customdata[1]|%Y-%m-%d}<br>"
+                    "Progress: %{customdata[2]:.0%}"
+                    "<extra></extra>"
+                )
             ))
             
             # Add completed progress bars
-            completed_days = (self.df['Completed End'] - self.df['Start']).dt.days
             fig.add_trace(go.Bar(
                 y=self.df['Task'],
-                x=completed_days,
+                x=self.df['CompletedDays'],
                 base=self.df['Start'],
                 orientation='h',
                 name='Completed',
@@ -226,37 +219,37 @@ class ProjectVisualizer:
             # Add milestones (0-1 day tasks)
             milestones = self.df[self.df['Duration'] <= 1]
             if not milestones.empty:
-                fig.add_trace(go.Scatter(
+                fig.add_trace(go.Scattergl(
                     x=milestones['Start'] + timedelta(hours=12),
                     y=milestones['Task'],
                     mode='markers',
                     marker=dict(symbol='diamond', size=15, color='red'),
                     name='Milestones',
-                    hoverinfo='text',
-                    hovertext=[f"<b>{row['Task']}</b>" for _, row in milestones.iterrows()]
+                    hovertemplate="<b>%{y}</b><extra></extra>"
                 ))
             
-            # Add dependency arrows
-            for idx, row in self.df.iterrows():
-                for pred in row['Predecessors']:
+            # Add dependency arrows as one line trace (None breaks the line between arrows)
+            row_to_task = dict(zip(self.df['Row'], self.df['Task']))
+            task_to_end = dict(zip(self.df['Task'], self.df['End']))
+            dep_x, dep_y = [], []
+            for task, start, preds in zip(self.df['Task'], self.df['Start'], self.df['Predecessors']):
+                for pred in preds:
                     # Try to find predecessor by row number or task name
-                    pred_row = None
-                    if pred.isdigit():
-                        pred_row = self.df[self.df['Row'] == int(pred)]
-                    else:
-                        pred_row = self.df[self.df['Task'] == pred]
-                    if not pred_row.empty:
-                        pred_task = pred_row.iloc[0]
+                    pred_task = row_to_task.get(int(pred)) if pred.isdigit() else pred
+                    if pred_task in task_to_end:
                         # Arrow: from end of predecessor to start of current
-                        fig.add_shape(
-                            type='line',
-                            x0=pred_task['End'],
-                            y0=pred_task['Task'],
-                            x1=row['Start'],
-                            y1=row['Task'],
-                            line=dict(color='blue', width=2, dash='dot'),
-                            xref='x', yref='y'
-                        )
+                        dep_x += [task_to_end[pred_task], start, None]
+                        dep_y += [pred_task, task, None]
+            if dep_x:
+                fig.add_trace(go.Scattergl(
+                    x=dep_x,
+                    y=dep_y,
+                    mode='lines',
+                    line=dict(color='blue', width=2, dash='dot'),
+                    name='Dependencies',
+                    showlegend=False,
+                    hoverinfo='skip'
+                ))
             
             # Update layout
             fig.update_layout(
@@ -286,12 +279,14 @@ class ProjectVisualizer:
             
             # Save outputs
             html_path = os.path.join(output_dir, 'gantt_chart.html')
-            fig.write_html(html_path)
+            fig.write_html(html_path, include_plotlyjs='cdn')
             self.logger.info(f"Saved interactive Gantt chart to {html_path}")
             
-            png_path = os.path.join(output_dir, 'gantt_chart.png')
-            fig.write_image(png_path, width=1200, height=800)
-            self.logger.info(f"Saved Gantt chart image to {png_path}")
+            # Static export starts a Kaleido renderer, so only do it on request
+            if emit_png:
+                png_path = os.path.join(output_dir, 'gantt_chart.png')
+                fig.write_image(png_path, width=1200, height=800)
+                self.logger.info(f"Saved Gantt chart image to {png_path}")
             
             return True
             
@@ -306,6 +301,7 @@ def main():
     parser.add_argument('--sheet', default='Project schedule', help='Sheet name containing project data')
     parser.add_argument('--gantt', action='store_true', help='Generate Gantt chart')
     parser.add_argument('--output', default='output', help='Output directory for visualizations')
+    parser.add_argument('--png', action='store_true', help='Also export the Gantt chart as a PNG image (requires kaleido)')
     
     args = parser.parse_args()
     
@@ -321,7 +317,7 @@ def main():
     
     # Generate requested visualizations
     if args.gantt:
-        visualizer.create_gantt_chart(args.output)
+        visualizer.create_gantt_chart(args.output, emit_png=args.png)
     
     logging.info("Process completed successfully")
 
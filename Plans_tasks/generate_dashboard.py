@@ -1,89 +1,234 @@
 import os
+import warnings
+import zipfile
+from xml.etree import ElementTree
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from functools import partial
 import pandas as pd
 from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.styles import PatternFill, Font
 from openpyxl.formatting.rule import CellIsRule, FormulaRule
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.worksheet.filters import AutoFilter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+import matplotlib
+matplotlib.use("Agg")  # Charts are only saved to files; skip interactive backend start-up
 import matplotlib.pyplot as plt
 
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None  # Fall back to openpyxl's read-only reader
+
+# Chart axes reused across dashboards, created on first use
+_chart_ax = None
+
+# Namespace of xl/workbook.xml, read to find the active tab for calamine
+_SPREADSHEETML_NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+def _active_sheet_name(fpath):
+    # Calamine has no notion of the selected tab, so read it from the workbook part as openpyxl does
+    try:
+        with zipfile.ZipFile(fpath) as zf:
+            root = ElementTree.fromstring(zf.read('xl/workbook.xml'))
+    except (KeyError, ElementTree.ParseError):
+        return None  # Unusual package layout: the caller falls back to the first sheet
+    view = root.find('m:bookViews/m:workbookView', _SPREADSHEETML_NS)
+    index = int(view.get('activeTab', 0)) if view is not None else 0
+    sheets = root.findall('m:sheets/m:sheet', _SPREADSHEETML_NS)
+    return sheets[index].get('name') if index < len(sheets) else None
+
+def _normalize_cell(v):
+    # '' counts as empty (calamine cannot tell it from a blank cell), whole-number floats
+    # (calamine's 2025.0) become ints and date-only cells become datetimes, as openpyxl returns them
+    if v == '':
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    if type(v) is date:
+        return datetime(v.year, v.month, v.day)
+    return v
+
+def _normalize_sheet_rows(rows):
+    # Make calamine and openpyxl agree cell by cell, then drop trailing empty rows/columns
+    rows = [tuple(_normalize_cell(v) for v in row) for row in rows]
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()
+    width = max((i + 1 for row in rows for i, v in enumerate(row) if v is not None), default=0)
+    return [row[:width] + (None,) * (width - len(row)) for row in rows]
+
+# Read one sheet as (header, values) pairs, preferring calamine over openpyxl
+def _read_columns(fpath, sheet_name=None):
+    if CalamineWorkbook is not None:
+        wb = CalamineWorkbook.from_path(fpath)
+        if not (sheet_name and sheet_name in wb.sheet_names):
+            # Default to the active tab, like the openpyxl path's wb.active
+            sheet_name = _active_sheet_name(fpath)
+        if sheet_name in wb.sheet_names:
+            ws = wb.get_sheet_by_name(sheet_name)
+        else:
+            ws = wb.get_sheet_by_index(0)
+        rows = ws.to_python(skip_empty_area=False)
+        wb.close()
+    else:
+        wb = load_workbook(fpath, read_only=True, data_only=True)
+        if sheet_name and sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+        else:
+            ws = wb.active
+        rows = list(ws.iter_rows(values_only=True))
+        wb.close()
+    rows = _normalize_sheet_rows(rows)
+    if not rows:
+        return []
+    # Transpose once so each column arrives as a single sequence
+    columns = zip(*rows[1:]) if len(rows) > 1 else ([] for _ in rows[0])
+    # Pairs rather than a dict: blank headers all read as None and must not collapse
+    return list(zip(rows[0], columns))
+
+def _read_one(fpath, sheet_name=None):
+    # Worker entry point: reports errors as text so one bad file does not stop the others
+    try:
+        return _read_columns(fpath, sheet_name), None
+    except Exception as e:
+        return None, str(e)
+
 # 1. Loop through all Excel files in the folder and extract data
 def extract_and_consolidate(folder, sheet_name=None):
-    all_data = []
-    for fname in os.listdir(folder):
-        if fname.endswith('.xlsx') and not fname.startswith('~$'):
-            fpath = os.path.join(folder, fname)
-            try:
-                wb = load_workbook(fpath, data_only=True)
-                if sheet_name and sheet_name in wb.sheetnames:
-                    ws = wb[sheet_name]
-                else:
-                    ws = wb.active
-                data = ws.values
-                cols = next(data)
-                df = pd.DataFrame(data, columns=cols)
-                df['SourceFile'] = fname
-                all_data.append(df)
-            except Exception as e:
-                print(f"Error reading {fname}: {e}")
-    if all_data:
-        return pd.concat(all_data, ignore_index=True)
-    return pd.DataFrame()
+    fnames = [f for f in os.listdir(folder) if f.endswith('.xlsx') and not f.startswith('~$')]
+    paths = [os.path.join(folder, fname) for fname in fnames]
+    # Each workbook parses independently, so spread the files over worker processes
+    read_one = partial(_read_one, sheet_name=sheet_name)
+    workers = min(len(paths), os.cpu_count() or 1)
+    results = None
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                results = list(ex.map(read_one, paths))
+        except BrokenProcessPool:
+            # Spawned workers re-run an unguarded __main__ and die; read the files here instead
+            results = None
+    if results is None:
+        results = list(map(read_one, paths))
+    # Grow one list per column across all files and build a single DataFrame at the end
+    names = []
+    columns = []
+    sources = None
+    layouts = {}  # header tuple -> target column positions
+    total = 0
+    for fname, (data, error) in zip(fnames, results):
+        if error is not None:
+            print(f"Error reading {fname}: {error}")
+            continue
+        if not data:
+            continue
+        n = len(data[0][1])
+        # SourceFile is filled in below, replacing any column of that name in the file
+        data = [(label, values) for label, values in data if label != 'SourceFile']
+        labels = [label for label, _ in data]
+        if sources is None:
+            names = labels + ['SourceFile']
+            columns = [[] for _ in names]
+            sources = columns[-1]
+            layouts[tuple(labels)] = list(range(len(labels)))
+        # Files sharing a header layout line up by position
+        targets = layouts.get(tuple(labels))
+        if targets is None:
+            if len(set(labels)) == len(labels) and len(set(names)) == len(names):
+                # Distinct headers on both sides: line columns up by name
+                targets = []
+                for label in labels:
+                    if label not in names:
+                        names.append(label)
+                        columns.append([])
+                    targets.append(names.index(label))
+            else:
+                # Repeated headers cannot be matched by name, so keep them as extra columns
+                targets = list(range(len(names), len(names) + len(labels)))
+                names.extend(labels)
+                columns.extend([] for _ in labels)
+            layouts[tuple(labels)] = targets
+        for target, (_, values) in zip(targets, data):
+            col_values = columns[target]
+            if len(col_values) < total:
+                # Column missing from earlier files: pad their rows with None
+                col_values.extend([None] * (total - len(col_values)))
+            col_values.extend(values)
+        total += n
+        sources.extend([fname] * n)
+    if sources is None:
+        return pd.DataFrame()
+    for col_values in columns:
+        col_values.extend([None] * (total - len(col_values)))
+    df = pd.DataFrame(dict(enumerate(columns)))
+    df.columns = names
+    # Shrink integer columns to the smallest type that holds them
+    int_cols = df.select_dtypes('integer').columns
+    df[int_cols] = df[int_cols].apply(pd.to_numeric, downcast='integer')
+    return df
 
-# 2. Write consolidated data to master Excel file
-def write_master_excel(df, out_path):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Consolidated Data'
-    for r in dataframe_to_rows(df, index=False, header=True):
-        ws.append(r)
-    # Add table
-    tab = Table(displayName="ConsolidatedTable", ref=ws.dimensions)
+# 2. Write consolidated data to a master workbook (saved by the caller)
+def write_master_excel(df):
+    # Write-only mode streams rows to disk instead of keeping every cell in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Consolidated Data')
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        ws.append(row)
+    # Add table (write-only sheets have no dimensions, so the range comes from the frame)
+    tab = Table(displayName="ConsolidatedTable", ref=f"A1:{get_column_letter(len(df.columns))}{len(df) + 1}")
+    # Write-only mode cannot read the header cells back, so name the table columns explicitly
+    tab.tableColumns = [TableColumn(id=i, name=str(c)) for i, c in enumerate(df.columns, 1)]
+    tab.autoFilter = AutoFilter(ref=tab.ref)  # openpyxl only adds the header filter when it builds the columns
     style = TableStyleInfo(name="TableStyleMedium9", showRowStripes=True)
     tab.tableStyleInfo = style
-    ws.add_table(tab)
-    wb.save(out_path)
+    with warnings.catch_warnings():
+        # Raised for every write-only table, even when the columns are already named
+        warnings.filterwarnings("ignore", "In write-only mode you must add table columns manually")
+        ws.add_table(tab)
+    return wb
 
 # 3. Create pivot table and chart in Excel
-def add_pivot_and_chart(excel_path, pivot_col, value_col):
-    wb = load_workbook(excel_path)
-    ws = wb['Consolidated Data']
+def add_pivot_and_chart(wb, df, pivot_col, value_col):
     # Create a summary sheet
     if 'Summary' in wb.sheetnames:
         del wb['Summary']
     summary = wb.create_sheet('Summary')
-    # Simple pivot: sum by pivot_col
-    df = pd.DataFrame(ws.values)
-    df.columns = df.iloc[0]
-    df = df[1:]
-    pivot = df.groupby(pivot_col)[value_col].sum().reset_index()
+    # Simple pivot: sum by pivot_col, straight from the consolidated DataFrame
+    pivot = df.groupby(pivot_col, observed=True)[value_col].sum().reset_index()
     for r in dataframe_to_rows(pivot, index=False, header=True):
         summary.append(r)
-    # Add conditional formatting (top 10%)
-    max_row = summary.max_row
-    summary.conditional_formatting.add(f'B2:B{max_row}',
-        CellIsRule(operator='greaterThan', formula=[f'LARGE(B2:B{max_row},ROUND(COUNT(B2:B{max_row})*0.1,0))'], fill=PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')))
+    # Add conditional formatting (top 10%); write-only sheets don't track max_row
+    max_row = len(pivot) + 1
+    # Threshold is computed here so Excel compares against a constant instead of re-running LARGE/COUNT
+    threshold = float(pd.to_numeric(pivot[value_col], errors='coerce').quantile(0.9))
+    if pd.notna(threshold):
+        summary.conditional_formatting.add(f'B2:B{max_row}',
+            CellIsRule(operator='greaterThan', formula=[repr(threshold)], fill=PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')))
     # Add error highlighting (negative values)
     summary.conditional_formatting.add(f'B2:B{max_row}',
         CellIsRule(operator='lessThan', formula=['0'], fill=PatternFill(start_color='FF0000', end_color='FF0000', fill_type='solid')))
-    wb.save(excel_path)
+    return pivot
 
 # 4. Create a chart image and insert into Excel
-def add_chart_image(excel_path, pivot_col, value_col):
-    wb = load_workbook(excel_path)
-    ws = wb['Summary']
-    data = list(ws.values)
-    cols = data[0]
-    df = pd.DataFrame(data[1:], columns=cols)
-    plt.figure(figsize=(8,4))
-    plt.bar(df[pivot_col], pd.to_numeric(df[value_col], errors='coerce'))
-    plt.title(f'{value_col} by {pivot_col}')
-    plt.ylabel(value_col)
-    plt.xticks(rotation=45)
-    img_path = excel_path.replace('.xlsx', '_chart.png')
-    plt.tight_layout()
-    plt.savefig(img_path)
-    plt.close()
+def add_chart_image(pivot, pivot_col, value_col, img_path):
+    global _chart_ax
+    if _chart_ax is None:
+        _, _chart_ax = plt.subplots(figsize=(8,4))
+    else:
+        _chart_ax.clear()
+    x = pivot[pivot_col].to_numpy()
+    y = pd.to_numeric(pivot[value_col], errors='coerce').to_numpy()
+    _chart_ax.bar(x, y)
+    _chart_ax.set_title(f'{value_col} by {pivot_col}')
+    _chart_ax.set_ylabel(value_col)
+    _chart_ax.tick_params(axis='x', labelrotation=45)
+    fig = _chart_ax.figure
+    fig.tight_layout()
+    fig.savefig(img_path)
     return img_path
 
 # 5. Save as PDF (requires Excel/Windows)
@@ -107,13 +252,17 @@ def generate_dashboard(folder, sheet_name=None, pivot_col='SourceFile', value_co
     if not value_col:
         value_col = df.columns[-2]  # Guess a numeric column
     master_path = os.path.join(folder, 'MasterDashboard.xlsx')
-    write_master_excel(df, master_path)
-    add_pivot_and_chart(master_path, pivot_col, value_col)
-    chart_img = add_chart_image(master_path, pivot_col, value_col)
+    # Keep the master workbook open for the summary sheet and save it a single time
+    wb = write_master_excel(df)
+    pivot = add_pivot_and_chart(wb, df, pivot_col, value_col)
+    wb.save(master_path)
+    img_path = master_path.replace('.xlsx', '_chart.png')
+    chart_img = add_chart_image(pivot, pivot_col, value_col, img_path)
     pdf_path = master_path.replace('.xlsx', '.pdf')
     save_as_pdf(master_path, pdf_path)
     print(f"Dashboard saved as {master_path} and {pdf_path}")
     print(f"Chart image: {chart_img}")
 
-# Example usage:
-# generate_dashboard('path_to_folder', sheet_name='Sheet1', pivot_col='SourceFile', value_col='Sales')
+# Example usage (the __main__ guard lets the file reader start worker processes on Windows/macOS):
+# if __name__ == '__main__':
+#     generate_dashboard('path_to_folder', sheet_name='Sheet1', pivot_col='SourceFile', value_col='Sales')